@@ -1,94 +1,204 @@
+import gc
 import sys
+import time
+from functools import partial
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, 
                            QWidget, QVBoxLayout, QHBoxLayout, QFrame)
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtCore import Qt, QUrl, QSize, QPoint, QSettings
+from PyQt5.QtWebEngineWidgets import (QWebEngineView, QWebEnginePage, QWebEngineProfile,
+                                      QWebEngineSettings)
+from PyQt5.QtCore import (Qt, QUrl, QSize, QPoint, QSettings, QTimer, QObject,
+                          QThread, QMetaObject, pyqtSignal, pyqtSlot)
 from PyQt5.QtGui import QColor, QPalette, QFont
 
+# Applied once to the whole application rather than per widget
+FLOATING_BUTTON_QSS = """
+    QPushButton#floating {
+        background-color: #8B4513;
+        color: #FFE4B5;
+        border: 2px solid #4A2400;
+        border-radius: 3px;
+        padding: 3px;
+        font-family: 'Medieval';
+        font-size: 10px;
+        min-width: 40px;
+        max-width: 40px;
+        min-height: 20px;
+        max-height: 20px;
+    }
+    QPushButton#floating:hover {
+        background-color: #A0522D;
+    }
+"""
+
+WEBVIEW_QSS = """
+    QWebEngineView {
+        background-color: #1e1e1e;
+        border: 2px solid #4A2400;
+    }
+"""
+
 class FloatingButton(QPushButton):
     def __init__(self, text, parent=None):
         super().__init__(text, parent)
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: #8B4513;
-                color: #FFE4B5;
-                border: 2px solid #4A2400;
-                border-radius: 3px;
-                padding: 3px;
-                font-family: 'Medieval';
-                font-size: 10px;
-                min-width: 40px;
-                max-width: 40px;
-                min-height: 20px;
-                max-height: 20px;
-            }
-            QPushButton:hover {
-                background-color: #A0522D;
-            }
-        """)
-        self._mousePressPos = None
-        self._mousePressDelta = None
+        self.setObjectName("floating")
+        self._drag_offset = None
         
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self._mousePressPos = event.globalPos()
-            self._mousePressDelta = self.window().pos()
+            self._drag_offset = self.window().pos() - event.globalPos()
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
-        if event.buttons() == Qt.LeftButton and self._mousePressPos:
-            delta = event.globalPos() - self._mousePressPos
-            self.window().move(self._mousePressDelta + delta)
-            self.window().save_window_position()
+        if event.buttons() == Qt.LeftButton and self._drag_offset is not None:
+            self.window().drag_window(event.globalPos() + self._drag_offset)
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self._mousePressPos = None
+            self._drag_offset = None
+            self.window().finish_drag()
         super().mouseReleaseEvent(event)
 
 class DraggableWebView(QWebEngineView):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self._mousePressPos = None
-        self._mousePressDelta = None
+        self._drag_offset = None
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self._mousePressPos = event.globalPos()
-            self._mousePressDelta = self.window().pos()
+            self._drag_offset = self.window().pos() - event.globalPos()
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
-        if event.buttons() == Qt.LeftButton and self._mousePressPos is not None:
-            delta = event.globalPos() - self._mousePressPos
-            self.window().move(self._mousePressDelta + delta)
-            self.window().save_window_position()
+        if event.buttons() == Qt.LeftButton and self._drag_offset is not None:
+            self.window().drag_window(event.globalPos() + self._drag_offset)
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self._mousePressPos = None
+            self._drag_offset = None
+            self.window().finish_drag()
         super().mouseReleaseEvent(event)
 
+class SettingsWorker(QObject):
+    """Performs QSettings writes off the GUI thread"""
+    def __init__(self):
+        super().__init__()
+        self.settings = None
+
+    @pyqtSlot(str, object)
+    def write(self, key, value):
+        # Created lazily so the QSettings instance belongs to the worker thread
+        if self.settings is None:
+            self.settings = QSettings('PQDI', 'WebViewer')
+        self.settings.setValue(key, value)
+
+    @pyqtSlot()
+    def sync(self):
+        if self.settings is not None:
+            self.settings.sync()
+
 class WebViewer(QMainWindow):
+    MOVE_INTERVAL_NS = 16_000_000  # ~60 Hz
+    writeRequested = pyqtSignal(str, object)
+
     def __init__(self):
         super().__init__()
+        # Read-only on the GUI thread (startup restore); all writes go through
+        # SettingsWorker, whose own instance lives on the worker thread
         self.settings = QSettings('PQDI', 'WebViewer')
+        self._settings_thread = QThread()
+        self._worker = SettingsWorker()
+        self._worker.moveToThread(self._settings_thread)
+        self.writeRequested.connect(self._worker.write, Qt.QueuedConnection)
+        self._settings_thread.start()
         self.website_loaded = False
         self.expanded_size = QSize(1000, 600)
         self.collapsed_size = QSize(290, 60)  # Slightly wider to accommodate hide button
         self.base_url = "https://www.pqdi.cc/spells"
         self.p99_url = "https://wiki.project1999.com/"
-        self._mousePressPos = None
-        self._mousePressDelta = None
+        # Parsed once; buttons are bound directly to these QUrl objects
+        self._site_urls = tuple(QUrl(url) for url in (self.base_url, self.p99_url))
+        self._known_urls = frozenset((self.base_url, self.p99_url))
+        self._last_url_str = ''
+        self._drag_offset = None
+        self._last_move_ns = 0
+        self._pending_pos = None
+        # Moves are applied once Qt has drained queued mouse events
+        self._move_timer = QTimer(self)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.timeout.connect(self._apply_pending_move)
+        # Coalesce settings writes while dragging instead of hitting disk per move
+        self._pending_settings = {}
+        self._last_saved = {'window_position': None, 'window_state': None, 'current_url': None}
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(250)
+        self._save_timer.timeout.connect(self._flush_settings)
+        # Periodically release web engine caches during long expanded sessions
+        self._gc_timer = QTimer(self)
+        self._gc_timer.setInterval(10 * 60 * 1000)
+        self._gc_timer.timeout.connect(self._periodic_gc)
         self.initUI()
         self.restore_window_position()
 
     def save_window_position(self):
-        self.settings.setValue('window_position', self.pos())
-        self.settings.setValue('window_state', self.website_loaded)
-        self.settings.setValue('current_url', self.web_view.url().toString())
+        self._save_position()
+        self._save_state()
+
+    def _save_position(self):
+        self._pending_settings['window_position'] = self.pos()
+        self._schedule_save()
+
+    def _save_state(self):
+        self._pending_settings['window_state'] = self.website_loaded
+        if self.web_view is not None:
+            self._pending_settings['current_url'] = self.web_view.url().toString()
+        self._schedule_save()
+
+    def _schedule_save(self):
+        if not self._save_timer.isActive():
+            self._save_timer.start()
+
+    def _flush_settings(self):
+        self._save_timer.stop()
+        for key, value in self._pending_settings.items():
+            # QSettings rewrites identical values, so skip anything unchanged
+            if self._last_saved.get(key) == value:
+                continue
+            self._last_saved[key] = value
+            self.writeRequested.emit(key, value)
+        self._pending_settings.clear()
+
+    def _periodic_gc(self):
+        # Only runs while a web view exists; collapsing clears everything anyway
+        self._profile.clearHttpCache()
+        gc.collect()
+
+    def drag_window(self, pos):
+        """Queue a window move during a drag, applied at most once per frame"""
+        if pos == self.pos():
+            # Nothing to move or save; also drops a queued move we've returned from
+            self._pending_pos = None
+            return
+        self._pending_pos = pos
+        if not self._move_timer.isActive():
+            elapsed = time.monotonic_ns() - self._last_move_ns
+            self._move_timer.start(max(0, self.MOVE_INTERVAL_NS - elapsed) // 1_000_000)
+
+    def _apply_pending_move(self):
+        if self._pending_pos is None:
+            return
+        self._last_move_ns = time.monotonic_ns()
+        self.move(self._pending_pos)
+        self._pending_pos = None
+        self._save_position()
+
+    def finish_drag(self):
+        """Apply any queued move and persist the result"""
+        self._move_timer.stop()
+        self._apply_pending_move()
+        self._flush_settings()
 
     def restore_window_position(self):
         position = self.settings.value('window_position')
@@ -103,38 +213,54 @@ class WebViewer(QMainWindow):
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self._mousePressPos = event.globalPos()
-            self._mousePressDelta = self.pos()
+            self._drag_offset = self.pos() - event.globalPos()
 
     def mouseMoveEvent(self, event):
-        if event.buttons() == Qt.LeftButton and self._mousePressPos is not None:
-            delta = event.globalPos() - self._mousePressPos
-            self.move(self._mousePressDelta + delta)
-            self.save_window_position()
+        if event.buttons() == Qt.LeftButton and self._drag_offset is not None:
+            self.drag_window(event.globalPos() + self._drag_offset)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self._mousePressPos = None
+            self._drag_offset = None
+            self.finish_drag()
         
     def closeEvent(self, event):
-        self.save_window_position()
+        # The only explicit sync: flush outstanding writes once at shutdown
+        if self._settings_thread.isRunning():
+            self._save_timer.stop()
+            self._gc_timer.stop()
+            self.save_window_position()
+            self._flush_settings()
+            QMetaObject.invokeMethod(self._worker, 'sync', Qt.BlockingQueuedConnection)
+            self._settings_thread.quit()
+            self._settings_thread.wait()
         super().closeEvent(event)
         
     def initUI(self):
+        # Build the whole widget tree before allowing a repaint
+        self.setUpdatesEnabled(False)
         self.setWindowTitle('Project Quarm Database Interface')
         self.resize(self.collapsed_size)
         
         self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.FramelessWindowHint)
         
         self.setAttribute(Qt.WA_TranslucentBackground)
+        # Parsed once; toggling just flips the "expanded" property
+        self.setProperty('expanded', False)
         self.setStyleSheet("""
-            QMainWindow {
+            QMainWindow[expanded="true"] {
+                background-color: #1e1e1e;
+                border: 2px solid #4A2400;
+            }
+            QMainWindow[expanded="false"] {
                 background: transparent;
             }
         """)
         
         self.central_widget = QWidget()
-        self.central_widget.setStyleSheet("background: transparent;")
+        # Scoped to the central widget so it doesn't override the app-wide QSS
+        self.central_widget.setObjectName("central")
+        self.central_widget.setStyleSheet("QWidget#central { background: transparent; }")
         self.setCentralWidget(self.central_widget)
         self.layout = QVBoxLayout(self.central_widget)
         self.layout.setContentsMargins(5, 5, 5, 15)
@@ -152,11 +278,12 @@ class WebViewer(QMainWindow):
         
         self.float_button = FloatingButton("PQDI", self)
         self.button_layout.addWidget(self.float_button)
-        self.float_button.clicked.connect(lambda: self.load_website(self.base_url))
+        pqdi_url, p99_url = self._site_urls
+        self.float_button.clicked.connect(partial(self._load_qurl, pqdi_url))
         
         self.p99_button = FloatingButton("P99", self)
         self.button_layout.addWidget(self.p99_button)
-        self.p99_button.clicked.connect(lambda: self.load_website(self.p99_url))
+        self.p99_button.clicked.connect(partial(self._load_qurl, p99_url))
         
         # Add new Hide button
         self.hide_button = FloatingButton("Hide", self)
@@ -168,33 +295,72 @@ class WebViewer(QMainWindow):
         self.button_layout.addWidget(self.close_button)
         self.close_button.clicked.connect(self.close)
         
+        # The web view and its profile are created on first expand
+        self.web_view = None
+        self._profile = None
+        self.setUpdatesEnabled(True)
+        self.update()
+
+    def _ensure_web_view(self):
+        """Create the web view if it was torn down on collapse"""
+        if self.web_view is not None:
+            return
+        if self._profile is None:
+            # Created after the central widget so pages are destroyed before
+            # the profile they use when the window is torn down
+            self._profile = QWebEngineProfile(self)
+            self._profile.setHttpCacheType(QWebEngineProfile.MemoryHttpCache)
+            self._profile.setHttpCacheMaximumSize(32 * 1024 * 1024)
+            # The reference sites don't need these; leaving them off trims the renderer
+            web_settings = self._profile.settings()
+            web_settings.setAttribute(QWebEngineSettings.PluginsEnabled, False)
+            web_settings.setAttribute(QWebEngineSettings.WebGLEnabled, False)
+            web_settings.setAttribute(QWebEngineSettings.Accelerated2dCanvasEnabled, False)
+            web_settings.setAttribute(QWebEngineSettings.LocalStorageEnabled, False)
+            web_settings.setAttribute(QWebEngineSettings.ScreenCaptureEnabled, False)
+            web_settings.setAttribute(QWebEngineSettings.PlaybackRequiresUserGesture, True)
         self.web_view = DraggableWebView()
+        self.web_view.setPage(QWebEnginePage(self._profile, self.web_view))
         self.web_view.setZoomFactor(0.8)
-        self.web_view.setUrl(QUrl("about:blank"))
         self.web_view.hide()
-        self.web_view.urlChanged.connect(self.handle_url_change)
-        self.web_view.setStyleSheet("""
-            QWebEngineView {
-                background-color: #1e1e1e;
-                border: 2px solid #4A2400;
-            }
-        """)
+        self.web_view.urlChanged.connect(self.handle_url_change, Qt.QueuedConnection)
         self.layout.addWidget(self.web_view)
 
+    def _destroy_web_view(self):
+        """Delete the web view so its renderer process and caches are released"""
+        self._gc_timer.stop()
+        self.layout.removeWidget(self.web_view)
+        self.web_view.urlChanged.disconnect()
+        self.web_view.hide()
+        self.web_view.deleteLater()
+        self.web_view = None
+        # The back button is hidden on collapse, so the next URL must be handled
+        self._last_url_str = ''
+        self._profile.clearHttpCache()
+        self._profile.clearAllVisitedLinks()
+
     def handle_url_change(self, url):
+        if self.web_view is None:
+            return
+        url_str = url.toString()
+        if url_str == self._last_url_str:
+            return
+        self._last_url_str = url_str
         if self.website_loaded:
-            if url.toString() not in [self.base_url, self.p99_url]:
+            if url_str not in self._known_urls:
                 self.back_button.show()
             else:
                 self.back_button.hide()
+        self._save_state()
     
     def go_back(self):
         self.web_view.back()
         
-    def load_website(self, url):
+    def _load_qurl(self, qurl, _checked=False):
         if not self.website_loaded:
             self.toggle_website()
-        self.web_view.setUrl(QUrl(url))
+        self.web_view.setUrl(qurl)
+        self._save_state()
         
     def hide_website(self):
         """Hide the web view and restore original button layout"""
@@ -202,37 +368,35 @@ class WebViewer(QMainWindow):
             self.toggle_website()
             
     def toggle_website(self):
+        self.setUpdatesEnabled(False)
         if not self.website_loaded:
             # Expand window and show website
+            self._ensure_web_view()
+            self._gc_timer.start()
             self.resize(self.expanded_size)
             self.web_view.show()
             self.close_button.hide()
             self.hide_button.show()  # Show hide button when expanded
             self.website_loaded = True
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: #1e1e1e;
-                    border: 2px solid #4A2400;
-                }
-            """)
         else:
             # Collapse window and hide website
-            self.web_view.setUrl(QUrl("about:blank"))
-            self.web_view.hide()
+            self._destroy_web_view()
             self.resize(self.collapsed_size)
             self.back_button.hide()
             self.hide_button.hide()  # Hide the hide button when collapsed
             self.close_button.show()
             self.website_loaded = False
-            self.setStyleSheet("""
-                QMainWindow {
-                    background: transparent;
-                }
-            """)
+        self.setProperty('expanded', self.website_loaded)
+        self.style().unpolish(self)
+        self.style().polish(self)
+        self.setUpdatesEnabled(True)
+        self.update()
+        self._save_state()
 
 def main():
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
+    app.setStyleSheet(FLOATING_BUTTON_QSS + WEBVIEW_QSS)
     app.setOrganizationName('PQDI')
     app.setApplicationName('WebViewer')
     viewer = WebViewer()